@@ -6,7 +6,6 @@ from pathlib import Path
 from rich.console import Console
 from rich.panel import Panel
 from axion.core.config import load_config, CONFIG_FILE
-from axion.core.providers import detect_provider
 from axion.core.i18n import t
 
 doctor_app = typer.Typer(help="Diagnose system and configuration issues.")
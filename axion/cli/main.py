@@ -1,21 +1,14 @@
 import typer
 import sys
 import os
+from functools import lru_cache
 from typing import Optional, List, Dict, Any
-from rich.console import Console
+from rich.console import Console, Group
 from rich.panel import Panel
-from rich.table import Table
-from rich.markdown import Markdown
-from rich.syntax import Syntax
-from dotenv import load_dotenv
-
-from axion.reasoning.engine import ReasoningEngine
-from axion.core.indexing import CodeIndexer
-from axion.models.base import get_model
-from axion.core.config import load_config, save_config, reset_config, CONFIG_FILE
-from axion.tools.diff import DiffApplier
-from axion.tools.git import GitTool
-from axion.core.providers import detect_provider
+
+# Heavy subsystems (reasoning, indexing, providers, dotenv) are imported inside
+# the commands that use them so `--help` and `config` stay fast.
+from axion.core.config import load_config, save_config, reset_config, CONFIG_FILE, CONFIG_DIR
 from axion.core.i18n import t
 from axion.cli.doctor import doctor_app
 
@@ -25,14 +18,19 @@ EXIT_ERROR = 1
 EXIT_EXECUTION_FAILED = 2
 EXIT_VALIDATION_REJECTED = 3
 
-# Load environment variables from local .env
-load_dotenv()
-
-# Load environment variables from global Axion .env
-from axion.core.config import CONFIG_DIR
 GLOBAL_ENV = CONFIG_DIR / ".env"
-if GLOBAL_ENV.exists():
-    load_dotenv(GLOBAL_ENV)
+
+# Subcommands that never read provider keys, so .env files are not parsed for them
+NO_ENV_COMMANDS = {"config", "docs"}
+
+@lru_cache(maxsize=1)
+def load_env():
+    """Load environment variables from the local .env and the global Axion .env (once per process)."""
+    from dotenv import load_dotenv
+
+    load_dotenv(interpolate=False)
+    if GLOBAL_ENV.exists():
+        load_dotenv(GLOBAL_ENV, interpolate=False)
 
 app = typer.Typer(
     name="axion",
@@ -42,6 +40,29 @@ app = typer.Typer(
 app.add_typer(doctor_app, name="doctor")
 console = Console()
 
+def show_diff_log():
+    """Route DiffApplier progress messages to the console."""
+    import logging
+    from rich.logging import RichHandler
+
+    logger = logging.getLogger("axion.tools.diff")
+    if not logger.handlers:
+        logger.addHandler(RichHandler(console=console, show_time=False, show_level=False, show_path=False))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+def wants_help(ctx: typer.Context) -> bool:
+    """True for `axion <command> --help`, which Click only handles after this callback."""
+    if ctx.resilient_parsing:
+        return True
+    # Click has already moved the subcommand args off ctx, so look at argv
+    for arg in sys.argv[1:]:
+        if arg == "--":
+            break
+        if arg in ctx.help_option_names:
+            return True
+    return False
+
 @app.callback(invoke_without_command=True)
 def main(
     ctx: typer.Context,
@@ -50,10 +71,20 @@ def main(
     """
     Axion orchestrates LLMs to help you code with confidence.
     """
+    # Every command path (solve, AutoMode tools, ...) may apply diffs
+    show_diff_log()
+
+    # Help must not load .env files or start onboarding
+    if wants_help(ctx):
+        return
+
     # Skip onboarding for the config command itself
     if ctx.invoked_subcommand == "config":
         return
 
+    if ctx.invoked_subcommand not in NO_ENV_COMMANDS and ctx.invoked_subcommand is not None:
+        load_env()
+
     if dry_run:
         console.print("[bold yellow]⚠️ Running in DRY-RUN mode. No changes will be applied.[/]")
 
@@ -76,6 +107,14 @@ def main(
 
 
 def run_onboarding():
+    from rich.table import Table
+    from axion.core.providers import detect_or_probe_provider, clear_http_cache, ProviderKind, PROVIDER_LABELS
+
+    # Bare `axion` and `config` skip .env loading, but the stored-key check below needs it
+    load_env()
+    # A new onboarding run must not reuse probe results from an earlier one
+    clear_http_cache()
+
     console.print(Panel(
         t("onboarding.welcome"),
         title="Onboarding"
@@ -83,14 +122,20 @@ def run_onboarding():
     
     api_key = typer.prompt(t("onboarding.api_key_prompt"), hide_input=False)
     
-    provider = detect_provider(api_key)
+    provider = detect_or_probe_provider(api_key)
     if not provider:
-        console.print("[bold red]❌ Could not detect provider from the given key.[/]")
-        console.print("Make sure you are using a valid OpenAI (sk-...) or Anthropic (sk-ant-...) key.")
+        console.print(
+            "[bold red]❌ Could not detect provider from the given key.[/]\n"
+            "Make sure you are using a valid OpenAI (sk-...) or Anthropic (sk-ant-...) key."
+        )
         raise typer.Abort()
 
-    console.print(t("onboarding.provider_detected", provider=provider.name.upper()))
-    
+    console.print(t("onboarding.provider_detected", provider=PROVIDER_LABELS[provider.name]))
+    # An unrecognised key only matched because a local Ollama daemon answered
+    if provider.name is ProviderKind.OLLAMA and api_key.lower() != "ollama":
+        if not typer.confirm(t("onboarding.ollama_fallback_confirm"), default=False):
+            raise typer.Abort()
+
     with console.status(t("onboarding.models_consulting", provider=provider.name)):
         try:
             models = provider.list_models(api_key)
@@ -102,10 +147,14 @@ def run_onboarding():
         console.print(t("onboarding.no_models"))
         raise typer.Abort()
 
-    console.print(t("onboarding.select_model"))
-    for i, model in enumerate(models):
-        name_display = f" ({model.name})" if model.name else ""
-        console.print(f"{i+1}) [cyan]{model.id}[/]{name_display}")
+    # Heading and model menu render as one block
+    menu = Table.grid(padding=(0, 1))
+    menu.add_column(justify="right")
+    menu.add_column()
+    menu.add_column()
+    for i, model in enumerate(models, 1):
+        menu.add_row(f"{i})", f"[cyan]{model.id}[/]", f"({model.name})" if model.name else "")
+    console.print(Group(t("onboarding.select_model"), menu))
     
     choice = typer.prompt(t("onboarding.choice_prompt"), type=int, default=1)
     if 1 <= choice <= len(models):
@@ -124,8 +173,8 @@ def run_onboarding():
     use_env = typer.confirm(t("onboarding.env_confirm"), default=True)
     
     final_key_ref = api_key
-    if use_env and provider.name != "ollama":
-        env_var_name = f"{provider.name.upper()}_API_KEY"
+    if use_env and provider.name is not ProviderKind.OLLAMA:
+        env_var_name = f"{PROVIDER_LABELS[provider.name]}_API_KEY"
         console.print(t("onboarding.env_instruction", env_var=env_var_name))
         
         # Proactively offer to save the key to global .env if not already set or different
@@ -141,7 +190,7 @@ def run_onboarding():
 
     config = {
         "model": {
-            "provider": provider.name,
+            "provider": provider.name.value,
             "name": selected_model,
             "api_key": final_key_ref,
             "language": lang_choice,
@@ -150,10 +199,12 @@ def run_onboarding():
     }
     
     save_config(config)
-    console.print(t("onboarding.saved"))
-    console.print(f"Model: [bold]{selected_model}[/]")
-    console.print(f"Key reference: [dim]{final_key_ref}[/]")
-    console.print(t("onboarding.saved_location", path="~/.axion/config.toml"))
+    console.print(Group(
+        t("onboarding.saved"),
+        f"Model: [bold]{selected_model}[/]",
+        f"Key reference: [dim]{final_key_ref}[/]",
+        t("onboarding.saved_location", path="~/.axion/config.toml"),
+    ))
 
 @app.command()
 def review(
@@ -163,6 +214,10 @@ def review(
     """
     Review code in the specified path.
     """
+    from rich.table import Table
+    from axion.models.base import get_model
+    from axion.reasoning.engine import ReasoningEngine
+
     model = get_model()
     engine = ReasoningEngine(model)
     console.print(Panel(f"[bold blue]Axion[/] is reviewing: [yellow]{path}[/]", title="Review Mode"))
@@ -174,8 +229,8 @@ def review(
     try:
         result = engine.run_review(path)
         
-        # Display Results
-        console.print(Panel(result.summary, title="[bold blue]Review Summary[/]"))
+        # Display Results (collected into one Group so the report renders in a single write)
+        output = [Panel(result.summary, title="[bold blue]Review Summary[/]")]
         
         if result.issues:
             table = Table(title="[bold red]Identified Issues[/]", show_header=True, header_style="bold magenta")
@@ -188,25 +243,24 @@ def review(
                 color = "red" if issue.severity == "high" else "yellow" if issue.severity == "medium" else "blue"
                 table.add_row(issue.file, issue.type, issue.description, f"[{color}]{issue.severity}[/]")
             
-            console.print(table)
+            output.append(table)
         else:
-            console.print("[bold green]No issues identified! ✨[/]")
+            output.append("[bold green]No issues identified! ✨[/]")
 
         if result.strengths:
-            console.print("\n[bold green]💪 Strengths:[/]")
-            for s in result.strengths:
-                console.print(f"  - {s}")
+            output.append("\n[bold green]💪 Strengths:[/]")
+            output.extend(f"  - {s}" for s in result.strengths)
 
         if result.suggestions:
-            console.print("\n[bold cyan]💡 Suggestions:[/]")
-            for s in result.suggestions:
-                console.print(f"  - {s}")
+            output.append("\n[bold cyan]💡 Suggestions:[/]")
+            output.extend(f"  - {s}" for s in result.suggestions)
 
         color = "red" if result.risk_level == "high" else "yellow" if result.risk_level == "medium" else "green"
-        console.print(Panel(f"Resulting Risk Level: [{color} bold]{result.risk_level.upper()}[/]", expand=False))
+        output.append(Panel(f"Resulting Risk Level: [{color} bold]{result.risk_level.upper()}[/]", expand=False))
 
         # Show Report
-        console.print(engine.trace.get_report_table())
+        output.append(engine.trace.get_report_table())
+        console.print(Group(*output))
         raise typer.Exit(code=EXIT_SUCCESS)
 
     except Exception as e:
@@ -225,6 +279,11 @@ def solve(
     """
     Generate and apply a solution for the given query.
     """
+    from rich.syntax import Syntax
+    from axion.models.base import get_model
+    from axion.reasoning.engine import ReasoningEngine
+    from axion.tools.diff import DiffApplier
+
     # Interactive Input if no query provided
     if not query:
         console.print(t("solve.input_instruction"))
@@ -261,8 +320,9 @@ def solve(
             diff_output = engine.run_solve(current_query, session=session)
             session = engine.session
             
+            output = []
             if trace:
-                console.print(Panel(str(engine.trace), title=t("solve.trace_title"), border_style="cyan"))
+                output.append(Panel(str(engine.trace), title=t("solve.trace_title"), border_style="cyan"))
             
             # --- Diff Summary ---
             try:
@@ -279,13 +339,13 @@ def solve(
                             elif change.old is not None and change.new is None:
                                 deletions += 1
                 
-                console.print(t("diff.summary", files=files_changed, insertions=insertions, deletions=deletions))
+                output.append(t("diff.summary", files=files_changed, insertions=insertions, deletions=deletions))
             except:
                 pass # Swallow summary errors, show diff anyway
 
-            console.print(Panel(t("solve.diff_title")))
-            syntax = Syntax(diff_output, "diff", theme="monokai", line_numbers=True)
-            console.print(syntax)
+            output.append(Panel(t("solve.diff_title")))
+            output.append(Syntax(diff_output, "diff", theme="monokai", line_numbers=True))
+            console.print(Group(*output))
             
             if interactive:
                 action = typer.prompt(t("solve.interactive_prompt"), default="A").upper()
@@ -342,6 +402,10 @@ def plan(
     """
     Generate a step-by-step plan for a goal.
     """
+    from rich.markdown import Markdown
+    from axion.models.base import get_model
+    from axion.reasoning.engine import ReasoningEngine
+
     model = get_model()
     engine = ReasoningEngine(model)
     console.print(Panel(f"[bold blue]Axion[/] is planning: [yellow]{goal}[/]", title="Plan Mode"))
@@ -366,6 +430,8 @@ def clone(
     """
     Clone a remote Git repository into the Axion workspace (~/.axion/repos/).
     """
+    from axion.tools.git import GitTool
+
     console.print(Panel(f"🌐 [bold blue]Axion[/] is cloning: [yellow]{url}[/]", title="Clone Mode"))
     
     try:
@@ -387,6 +453,8 @@ def index(
     """
     Build a local vector index (RAG) for the project.
     """
+    from axion.core.indexing import CodeIndexer
+
     console.print(Panel(f"🔍 [bold blue]Axion[/] is indexing: [yellow]{path}[/]", title="Index Mode"))
     try:
         indexer = CodeIndexer(path)
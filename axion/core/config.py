@@ -38,11 +38,18 @@ def save_config(config: Dict[str, Any]):
     ensure_config_dir()
     with open(CONFIG_FILE, "wb") as f:
         tomli_w.dump(config, f)
+    _invalidate_caches()
 
 def reset_config():
     """Delete the configuration file."""
     if CONFIG_FILE.exists():
         CONFIG_FILE.unlink()
+    _invalidate_caches()
+
+def _invalidate_caches():
+    # Imported lazily: i18n depends on this module.
+    from axion.core.i18n import invalidate_lang_cache
+    invalidate_lang_cache()
 
 def resolve_config_value(value: Any) -> Any:
     """
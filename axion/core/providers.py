@@ -1,16 +1,91 @@
+import json
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import List, Optional
-import requests
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple, Type
+from importlib.util import find_spec
+import httpx
 from pydantic import BaseModel
+from axion import __version__
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+_HEADERS = {"User-Agent": f"axion/{__version__}"}
+
+# HTTP/2 multiplexes requests to the same host over one connection; it needs
+# the optional h2 package (installed by httpx[http2]).
+_HTTP2 = find_spec("h2") is not None
+
+# Shared connection pool so repeated calls to the same host reuse the TCP/TLS session.
+_CLIENT = httpx.Client(
+    headers=_HEADERS,
+    timeout=10.0,
+    transport=httpx.HTTPTransport(http2=_HTTP2, retries=2, limits=httpx.Limits(max_connections=8)),
+)
+
+# Model-list filters, compiled once so each model id is scanned in a single pass.
+_OPENAI_INCLUDE = re.compile(r"gpt-|o1|o3")
+_OPENAI_EXCLUDE = re.compile(
+    r"vision|instruct|audio|realtime|tts|dall-e|embedding|moderation|davinci|babbage|curie|ada",
+    re.IGNORECASE
+)
+_GEMINI_EXCLUDE = re.compile(r"nano|banana|vision|embedding|aqa|learnlm", re.IGNORECASE)
+_GROQ_EXCLUDE = re.compile(r"vision|audio", re.IGNORECASE)
+
+_OLLAMA_TAGS_URL = "http://localhost:11434/api/tags"
+
+# Parsed responses of local endpoints that get probed repeatedly (detection,
+# then model listing), keyed by URL and kept for a few seconds.
+_HTTP_CACHE: Dict[str, Tuple[float, Any]] = {}
+_HTTP_CACHE_TTL = 5.0
+
+def _cache_get(key: str) -> Any:
+    entry = _HTTP_CACHE.get(key)
+    if entry is None or time.monotonic() - entry[0] > _HTTP_CACHE_TTL:
+        return None
+    return entry[1]
+
+def _cache_put(key: str, value: Any) -> Any:
+    _HTTP_CACHE[key] = (time.monotonic(), value)
+    return value
+
+def clear_http_cache():
+    """Drop cached provider responses, e.g. before re-running onboarding."""
+    _HTTP_CACHE.clear()
+
+class ProviderKind(str, Enum):
+    OPENAI = "openai"
+    ANTHROPIC = "anthropic"
+    OLLAMA = "ollama"
+    GEMINI = "gemini"
+    GROQ = "groq"
+
+    def __str__(self) -> str:
+        return self.value
+
+# Display/env-var form of each provider name, computed once
+PROVIDER_LABELS: Dict[ProviderKind, str] = {kind: kind.value.upper() for kind in ProviderKind}
 
 class ModelInfo(BaseModel):
+    # Built with model_construct() in list_models: ids come straight from the
+    # provider APIs, so per-model validation is skipped.
     id: str
     name: Optional[str] = None
 
 class BaseProvider(ABC):
     @property
     @abstractmethod
-    def name(self) -> str:
+    def name(self) -> "ProviderKind":
         pass
 
     @abstractmethod
@@ -21,47 +96,82 @@ class BaseProvider(ABC):
     def list_models(self, api_key: str) -> List[ModelInfo]:
         pass
 
-class OpenAIProvider(BaseProvider):
+def _walk(data: Any, prefix: str) -> Iterable[Any]:
+    """Resolve an ijson prefix such as "data.item" against an already parsed document."""
+    for key in prefix.split(".")[:-1]:
+        data = data[key]
+    return data
+
+def _iter_items(url: str, prefix: str, **kwargs: Any) -> Iterator[Any]:
+    """
+    Yield the elements of the JSON array at `prefix` (ijson syntax, e.g. "data.item").
+    With ijson installed the body is fed to its push parser chunk by chunk while it
+    downloads and is never held whole.
+    """
+    with _CLIENT.stream("GET", url, **kwargs) as response:
+        response.raise_for_status()
+        if ijson is None:
+            yield from _walk(_loads(response.read()), prefix)
+            return
+        events = ijson.sendable_list()
+        parser = ijson.items_coro(events, prefix)
+        for chunk in response.iter_bytes():
+            parser.send(chunk)
+            yield from events
+            del events[:]
+        parser.close()
+        yield from events
+
+class OpenAICompatibleProvider(BaseProvider):
+    """
+    Shared implementation for providers exposing an OpenAI-style
+    `GET {BASE_URL}/models` endpoint authenticated with a bearer key.
+    """
+    KIND: ProviderKind
+    BASE_URL: str
+    KEY_PREFIX: str
+    INCLUDE_RE: Pattern[str] = re.compile("")  # matches every id
+    EXCLUDE_RE: Pattern[str] = re.compile("$^")  # matches no id
+
     @property
-    def name(self) -> str:
-        return "openai"
+    def name(self) -> ProviderKind:
+        return self.KIND
 
     def validate_key(self, api_key: str) -> bool:
-        if not api_key.startswith("sk-"):
+        if not api_key.startswith(self.KEY_PREFIX):
             return False
         # Simple validation request
         try:
-            response = requests.get(
-                "https://api.openai.com/v1/models",
-                headers={"Authorization": f"Bearer {api_key}"},
-                timeout=5
-            )
+            response = _CLIENT.get(f"{self.BASE_URL}/models", headers=self._headers(api_key), timeout=5)
             return response.status_code == 200
         except Exception:
             return False
 
     def list_models(self, api_key: str) -> List[ModelInfo]:
-        response = requests.get(
-            "https://api.openai.com/v1/models",
-            headers={"Authorization": f"Bearer {api_key}"},
-            timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
-        exclude_keywords = ["vision", "instruct", "audio", "realtime", "tts", "dall-e", "embedding", "moderation", "davinci", "babbage", "curie", "ada"]
-        
+        items = _iter_items(f"{self.BASE_URL}/models", "data.item", headers=self._headers(api_key), timeout=10)
+        return self._filter_models(m["id"] for m in items)
+
+    def _headers(self, api_key: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {api_key}"}
+
+    def _filter_models(self, model_ids: Iterable[str]) -> List[ModelInfo]:
         models = []
-        for m in data["data"]:
-            model_id = m["id"]
-            if not any(kw in model_id.lower() for kw in exclude_keywords):
-                if model_id.startswith("gpt-") or model_id.startswith("o1") or model_id.startswith("o3"):
-                    models.append(ModelInfo(id=model_id))
+        for model_id in model_ids:
+            if self.INCLUDE_RE.match(model_id) and not self.EXCLUDE_RE.search(model_id):
+                models.append(ModelInfo.model_construct(id=model_id))
         return sorted(models, key=lambda x: x.id)
 
+class OpenAIProvider(OpenAICompatibleProvider):
+    KIND = ProviderKind.OPENAI
+    BASE_URL = "https://api.openai.com/v1"
+    KEY_PREFIX = "sk-"
+    INCLUDE_RE = _OPENAI_INCLUDE
+    EXCLUDE_RE = _OPENAI_EXCLUDE
+
 class AnthropicProvider(BaseProvider):
     @property
-    def name(self) -> str:
-        return "anthropic"
+    def name(self) -> ProviderKind:
+        return ProviderKind.ANTHROPIC
 
     def validate_key(self, api_key: str) -> bool:
         if not api_key.startswith("sk-ant-"):
@@ -73,36 +183,44 @@ class AnthropicProvider(BaseProvider):
     def list_models(self, api_key: str) -> List[ModelInfo]:
         # Anthropic doesn't have a public models list API like OpenAI
         return [
-            ModelInfo(id="claude-3-5-sonnet-latest", name="Claude 3.5 Sonnet (Latest)"),
-            ModelInfo(id="claude-3-5-haiku-latest", name="Claude 3.5 Haiku (Latest)"),
-            ModelInfo(id="claude-3-opus-20240229", name="Claude 3 Opus"),
-            ModelInfo(id="claude-3-sonnet-20240229", name="Claude 3 Sonnet"),
-            ModelInfo(id="claude-3-haiku-20240307", name="Claude 3 Haiku"),
+            ModelInfo.model_construct(id="claude-3-5-sonnet-latest", name="Claude 3.5 Sonnet (Latest)"),
+            ModelInfo.model_construct(id="claude-3-5-haiku-latest", name="Claude 3.5 Haiku (Latest)"),
+            ModelInfo.model_construct(id="claude-3-opus-20240229", name="Claude 3 Opus"),
+            ModelInfo.model_construct(id="claude-3-sonnet-20240229", name="Claude 3 Sonnet"),
+            ModelInfo.model_construct(id="claude-3-haiku-20240307", name="Claude 3 Haiku"),
         ]
 
 class OllamaProvider(BaseProvider):
     @property
-    def name(self) -> str:
-        return "ollama"
+    def name(self) -> ProviderKind:
+        return ProviderKind.OLLAMA
 
     def validate_key(self, api_key: str) -> bool:
         # Ollama doesn't use keys by default, we just check if it's reachable
         try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=2)
-            return response.status_code == 200
+            self._tags(timeout=2)
+            return True
         except Exception:
             return False
 
     def list_models(self, api_key: str) -> List[ModelInfo]:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        return [ModelInfo(id=m["name"]) for m in data["models"]]
+        return self._parse_models(self._tags(timeout=5))
+
+    def _tags(self, timeout: float) -> dict:
+        data = _cache_get(_OLLAMA_TAGS_URL)
+        if data is None:
+            response = _CLIENT.get(_OLLAMA_TAGS_URL, timeout=timeout)
+            response.raise_for_status()
+            data = _cache_put(_OLLAMA_TAGS_URL, _loads(response.content))
+        return data
+
+    def _parse_models(self, data: dict) -> List[ModelInfo]:
+        return [ModelInfo.model_construct(id=str(m["name"])) for m in data["models"]]
 
 class GeminiProvider(BaseProvider):
     @property
-    def name(self) -> str:
-        return "gemini"
+    def name(self) -> ProviderKind:
+        return ProviderKind.GEMINI
 
     def validate_key(self, api_key: str) -> bool:
         if not api_key.startswith("AIza"):
@@ -112,70 +230,69 @@ class GeminiProvider(BaseProvider):
     def list_models(self, api_key: str) -> List[ModelInfo]:
         # Gemini API URL for listing models
         url = f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}"
-        response = requests.get(url, timeout=10)
+        response = _CLIENT.get(url, timeout=10)
         response.raise_for_status()
-        data = response.json()
-        
-        exclude_keywords = ["nano", "banana", "vision", "embedding", "aqa", "learnlm"]
-        
+        return self._parse_models(_loads(response.content))
+
+    def _parse_models(self, data: dict) -> List[ModelInfo]:
         models = []
         for m in data["models"]:
             model_id = m["name"].split("/")[-1]
-            display_name = m["displayName"]
+            display_name = str(m["displayName"])
             
             # Check if it supports generation and doesn't have excluded keywords
             if "generateContent" in m["supportedGenerationMethods"]:
-                if not any(kw in model_id.lower() or kw in display_name.lower() for kw in exclude_keywords):
-                    models.append(ModelInfo(id=model_id, name=display_name))
+                if not (_GEMINI_EXCLUDE.search(model_id) or _GEMINI_EXCLUDE.search(display_name)):
+                    models.append(ModelInfo.model_construct(id=model_id, name=display_name))
         
         return models
 
-class GroqProvider(BaseProvider):
-    @property
-    def name(self) -> str:
-        return "groq"
+class GroqProvider(OpenAICompatibleProvider):
+    KIND = ProviderKind.GROQ
+    BASE_URL = "https://api.groq.com/openai/v1"
+    KEY_PREFIX = "gsk_"
+    # Filter for text models
+    EXCLUDE_RE = _GROQ_EXCLUDE
 
-    def validate_key(self, api_key: str) -> bool:
-        if not api_key.startswith("gsk_"):
-            return False
-        return True
+# Most specific prefix first so "sk-" never swallows "sk-ant-".
+_PREFIX_MAP = (
+    ("sk-ant-", AnthropicProvider),
+    ("gsk_", GroqProvider),
+    ("sk-", OpenAIProvider),
+    ("AIza", GeminiProvider),
+)
 
-    def list_models(self, api_key: str) -> List[ModelInfo]:
-        # Groq uses OpenAI-compatible models endpoint
-        response = requests.get(
-            "https://api.groq.com/openai/v1/models",
-            headers={"Authorization": f"Bearer {api_key}"},
-            timeout=10
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        # Filter for text models
-        exclude_keywords = ["vision", "audio"]
-        models = []
-        for m in data["data"]:
-            model_id = m["id"]
-            if not any(kw in model_id.lower() for kw in exclude_keywords):
-                models.append(ModelInfo(id=model_id))
-        return sorted(models, key=lambda x: x.id)
+# Providers are stateless, so one shared instance per class is enough.
+_INSTANCES: Dict[Type[BaseProvider], BaseProvider] = {}
+
+def _get_instance(cls: Type[BaseProvider]) -> BaseProvider:
+    provider = _INSTANCES.get(cls)
+    if provider is None:
+        provider = _INSTANCES[cls] = cls()
+    return provider
 
 def detect_provider(api_key: str) -> Optional[BaseProvider]:
     """
     Attempts to detect the provider based on the API key or environment.
     """
     if api_key.lower() == "ollama":
-        return OllamaProvider()
-    
-    if api_key.startswith("sk-ant-"):
-        return AnthropicProvider()
-    
-    if api_key.startswith("gsk_"):
-        return GroqProvider()
-    
-    if api_key.startswith("sk-"):
-        return OpenAIProvider()
-    
-    if api_key.startswith("AIza"):
-        return GeminiProvider()
-        
+        return _get_instance(OllamaProvider)
+
+    for prefix, cls in _PREFIX_MAP:
+        if api_key.startswith(prefix):
+            return _get_instance(cls)
+
     return None
+
+def detect_or_probe_provider(api_key: str) -> Optional[BaseProvider]:
+    """
+    Like detect_provider, but a key with no known prefix falls back to a local
+    Ollama daemon if one is running. Ollama ignores the key, so callers should
+    confirm that fallback with the user.
+    """
+    provider = detect_provider(api_key)
+    if provider:
+        return provider
+
+    ollama = _get_instance(OllamaProvider)
+    return ollama if ollama.validate_key(api_key) else None
@@ -1,9 +1,23 @@
+import logging
 import os
+import re
 import shutil
+import subprocess
 import pathlib
 from pathlib import Path
 import whatthepatch
-from typing import List, Tuple, Optional, Any
+from collections import namedtuple
+from functools import lru_cache
+from typing import AnyStr, Dict, List, Tuple, Optional, Any
+
+log = logging.getLogger(__name__)
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+# git extended header lines that may sit between "diff --git" and "---"
+_GIT_HEADER_PREFIXES = ("diff ", "index ", "new file mode", "deleted file mode", "old mode", "new mode", "similarity", "rename ")
+
+# whatthepatch's diffobj plus the "\ No newline at end of file" marker of each side
+_Patch = namedtuple("_Patch", ["header", "changes", "text", "old_no_eol", "new_no_eol"])
 
 class DiffApplier:
     @staticmethod
@@ -12,162 +26,398 @@ class DiffApplier:
         Strictly validates that the context lines in the patch exist in the file content
         at the expected locations.
         """
-        if not patch.changes:
-            return True
+        return DiffApplier._context_matches(patch, DiffApplier._split_lines(file_content))
 
-        file_lines = file_content.splitlines()
-        
-        # We need to simulate the patch application to check context
-        # whatthepatch.apply_diff does this, returning None if context doesn't match
-        try:
-            result = whatthepatch.apply_diff(patch, file_lines)
-            return result is not None
-        except Exception:
-            return False
+    @staticmethod
+    def _context_matches(patch: Any, lines: List[str]) -> bool:
+        """
+        Compares every context and removed line of the patch with the file line at its
+        declared position. Cheap enough to reject a hallucinated diff before applying it.
+        """
+        n_lines = len(lines)
+        for change in patch.changes or ():
+            if change.old is not None and change.line is not None:
+                if not 1 <= change.old <= n_lines or lines[change.old - 1] != change.line:
+                    return False
+        return True
 
     @staticmethod
     def apply_unified_diff(diff_text: str, base_path: str = ".") -> bool:
         """
         Applies a unified diff to files in the base_path.
-        Includes PRE-FLIGHT DRY-RUN, strict context checking, and then atomic application.
+        Every patch is first resolved in memory (dry run, strict context checking);
+        files are only written once the whole diff is known to apply.
         """
         try:
-            patches = list(whatthepatch.parse_patch(diff_text))
+            patches = DiffApplier._parse(diff_text)
         except Exception as e:
-            print(f"❌ ERROR: Failed to parse diff: {e}")
+            log.error("❌ ERROR: Failed to parse diff: %s", e)
             return False
 
         if not patches:
-            print("❌ ERROR: No valid patches found in the diff text.")
+            log.error("❌ ERROR: No valid patches found in the diff text.")
             return False
 
         base = Path(base_path)
-        backup_dir = base / ".axion" / "backups"
-        
+
         # --- PHASE 1: PRE-FLIGHT VALIDATION (DRY RUN) ---
-        print("🛡️  Running Structural Guard (Dry Run)...")
-        pending_changes: List[Tuple[Path, List[str]]] = []
-        
+        log.info("🛡️  Running Structural Guard (Dry Run)...")
+        try:
+            plan = DiffApplier._plan(patches, base)
+        except ValueError as e:
+            log.error("❌ ERROR: %s", e)
+            return False
+
+        log.info("✅ Structural Guard Passed. Applying changes...")
+
+        # --- PHASE 2: APPLICATION ---
+        # Files _commit has started on, with their originals; only these need restoring
+        touched: Dict[Path, Optional[bytes]] = {}
+        try:
+            DiffApplier._commit(plan, touched)
+            log.info("SUCCESS: Applied changes to %d files.", len(plan))
+            
+            # 3. Post-flight Validation (Tests)
+            if not DiffApplier.run_post_flight(base):
+                raise Exception("Post-flight validation failed. Tests are broken.")
+            
+            return True
+
+        except Exception as e:
+            log.error("CRITICAL ERROR during write: %s. Starting rollback...", e)
+            DiffApplier._rollback(touched)
+            return False
+
+    @staticmethod
+    def _parse(diff_text: str) -> List[Any]:
+        """Parses diff_text strictly, falling back to whatthepatch for what that cannot handle."""
+        patches = DiffApplier._parse_patches(diff_text)
+        if patches is None:
+            patches = list(whatthepatch.parse_patch(diff_text))
+        return patches
+
+    @staticmethod
+    def _parse_patches(diff_text: str) -> Optional[List[Any]]:
+        """
+        Strict unified diff parser: hunks end when their line counts are used up,
+        so a following "--- file" header is never mistaken for a removed line.
+        Produces patch objects shaped like whatthepatch's, which additionally record
+        whether each side ends without a newline. Returns None for anything
+        it does not handle (binary patches, malformed hunks), so the caller can
+        fall back to whatthepatch.parse_patch.
+        """
+        patches = []
+        header = None
+        changes: List[Any] = []
+        hunk = old_left = new_left = old_no = new_no = 0
+        old_no_eol = new_no_eol = False
+        prev_tag = None
+        lines = diff_text.split("\n")
+        if lines[-1] == "":
+            lines.pop()
+
+        i = 0
+        while i < len(lines):
+            line = lines[i].rstrip("\r")
+            i += 1
+
+            if line.startswith("\\"):
+                # "\ No newline at end of file" applies to the side(s) of the line before it
+                if prev_tag is None:
+                    return None
+                old_no_eol = old_no_eol or prev_tag in " -"
+                new_no_eol = new_no_eol or prev_tag in " +"
+                continue
+
+            if old_left > 0 or new_left > 0:
+                tag, text = line[:1], line[1:]
+                prev_tag = tag or " "
+                if tag == " " or not line:
+                    changes.append(whatthepatch.patch.Change(old_no, new_no, text, hunk))
+                    old_no += 1
+                    new_no += 1
+                    old_left -= 1
+                    new_left -= 1
+                elif tag == "-":
+                    changes.append(whatthepatch.patch.Change(old_no, None, text, hunk))
+                    old_no += 1
+                    old_left -= 1
+                elif tag == "+":
+                    changes.append(whatthepatch.patch.Change(None, new_no, text, hunk))
+                    new_no += 1
+                    new_left -= 1
+                else:
+                    return None
+                if old_left < 0 or new_left < 0:
+                    return None
+                continue
+
+            if line.startswith("--- ") and i < len(lines) and lines[i].startswith("+++ "):
+                if header is not None:
+                    patches.append(_Patch(header, changes, "", old_no_eol, new_no_eol))
+                old_path = line[4:].split("\t")[0].strip()
+                new_path = lines[i].rstrip("\r")[4:].split("\t")[0].strip()
+                header = whatthepatch.patch.header(
+                    index_path=None, old_path=old_path, old_version=None, new_path=new_path, new_version=None
+                )
+                changes = []
+                hunk = 0
+                old_no_eol = new_no_eol = False
+                prev_tag = None
+                i += 1
+            elif line.startswith("@@"):
+                match = _HUNK_RE.match(line)
+                if match is None or header is None:
+                    return None
+                old_start, old_len, new_start, new_len = match.groups()
+                old_no, new_no = int(old_start), int(new_start)
+                old_left = 1 if old_len is None else int(old_len)
+                new_left = 1 if new_len is None else int(new_len)
+                # An empty side ("-0,0") numbers from the line after its start
+                old_no += old_left == 0
+                new_no += new_left == 0
+                hunk += 1
+            elif line.startswith(("GIT binary patch", "Binary files")):
+                return None
+            elif line.startswith((" ", "+", "-")) and not line.startswith(_GIT_HEADER_PREFIXES):
+                # Diff body outside any hunk: the counts were wrong
+                return None
+
+        if old_left > 0 or new_left > 0:
+            return None
+        if header is not None:
+            patches.append(_Patch(header, changes, "", old_no_eol, new_no_eol))
+        return patches
+
+    @staticmethod
+    def _splice(patch: Any, lines: List[bytes]) -> Optional[List[bytes]]:
+        """
+        Applies the hunks of patch to the raw lines of a file in a single pass.
+        Every context and removed line must equal the file slice at its declared
+        position (no fuzz). Only the hunk lines are encoded; the file is never
+        decoded. Returns None on any mismatch.
+        """
+        # hunk number -> [old side lines, new side lines, first new line number]
+        hunks: Dict[int, List[Any]] = {}
+        for change in patch.changes or ():
+            hunk = hunks.setdefault(change.hunk, [[], [], None])
+            if change.old is not None:
+                if hunk[0] and change.old != hunk[0][-1][0] + 1:
+                    return None
+                hunk[0].append((change.old, change.line.encode("utf-8")))
+            if change.new is not None:
+                hunk[1].append(change.line.encode("utf-8"))
+                if hunk[2] is None:
+                    hunk[2] = change.new
+
+        result: List[bytes] = []
+        pos = offset = 0
+        for old, new, first_new in hunks.values():
+            # A pure insertion has no old side; place it from the new-side number
+            start = old[0][0] - 1 if old else first_new - 1 - offset
+            old_lines = [line for _, line in old]
+            if start < pos or lines[start:start + len(old_lines)] != old_lines:
+                return None
+            result.extend(lines[pos:start])
+            result.extend(new)
+            pos = start + len(old_lines)
+            offset += len(new) - len(old_lines)
+
+        # Honour "\ No newline at end of file" (whatthepatch patches never set it)
+        tail = lines[pos:]
+        if getattr(patch, "new_no_eol", False):
+            if tail == [b""]:
+                tail = []
+        elif getattr(patch, "old_no_eol", False) and not tail:
+            tail = [b""]
+        result.extend(tail)
+        return result
+
+    @staticmethod
+    def _plan(patches: List[Any], base: Path) -> List[Tuple[Path, Optional[bytes], Optional[bytes]]]:
+        """
+        Resolves every patch against the files on disk without writing anything.
+        Returns (target, original bytes or None if the file is new, new bytes or
+        None to delete) per file. Several patches for the same file are applied in
+        sequence; CRLF files keep their line endings. Raises ValueError on the
+        first patch that cannot be applied.
+        """
+        originals: Dict[Path, Optional[bytes]] = {}
+        results: Dict[Path, Optional[List[bytes]]] = {}
+        eols: Dict[Path, bytes] = {}
+
+        base_dir = os.path.realpath(base)
+        base_prefix = os.path.join(base_dir, "")
+
         for patch in patches:
             if not patch.header:
                 continue
             
-            # Resolve path
-            rel_path = patch.header.new_path
-            is_new = (patch.header.old_path == "/dev/null")
-            is_delete = (patch.header.new_path == "/dev/null")
+            rel_path, is_new, is_delete = DiffApplier._classify(patch.header.old_path, patch.header.new_path)
+            if rel_path is None:
+                continue
 
-            if is_new:
-                rel_path = patch.header.new_path
-            elif is_delete:
-                rel_path = patch.header.old_path
+            # Follow symlinks so the real file is patched (the link is kept) and a
+            # linked directory cannot lead outside the base
+            target_path = os.path.realpath(os.path.join(base_dir, rel_path))
+            if not target_path.startswith(base_prefix):
+                raise ValueError(f"Refusing to patch {rel_path}: outside of {base_dir}.")
+            target_file = Path(target_path)
+
+            # Read each file once; later patches for it build on the pending lines.
+            # The read itself is the existence check, so no separate stat is needed.
+            if target_file in results:
+                lines = results[target_file]
             else:
-                rel_path = patch.header.new_path or patch.header.old_path
+                try:
+                    original = target_file.read_bytes()
+                except FileNotFoundError:
+                    original = None
+                    lines = None
+                else:
+                    # Same NUL heuristic git uses to spot binary files
+                    if b"\0" in original:
+                        raise ValueError(f"Could not verify context for binary file: {rel_path}")
+                    lines = DiffApplier._split_lines(original)
+                    # Like editors, take the line ending from the first line
+                    first_lf = original.find(b"\n")
+                    if first_lf > 0 and original[first_lf - 1] == 13:  # b"\r"
+                        eols[target_file] = b"\r\n"
+                originals[target_file] = original
 
-            if not rel_path or rel_path == "/dev/null":
-                continue
-            
-            # Clean up path
-            if rel_path.startswith("a/") or rel_path.startswith("b/"):
-                rel_path = rel_path[2:]
-            
-            target_file = (base / rel_path).resolve()
-            
             # Check existence scenarios
-            if not is_new and not target_file.exists():
-                print(f"❌ ERROR: Target file {target_file} does not exist.")
-                return False
-                
-            # Read content
-            content = ""
-            if target_file.exists():
-                try:
-                    with open(target_file, "r", encoding="utf-8") as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                     print(f"❌ ERROR: Could not verify context for binary/non-utf8 file: {rel_path}")
-                     return False
-            
+            if not is_new and lines is None:
+                raise ValueError(f"Target file {target_file} does not exist.")
+
+            if is_new:
+                # reconstruct from patch changes for new file
+                new_lines = [change.line.encode("utf-8") for change in patch.changes if change.line is not None]
+                if not getattr(patch, "new_no_eol", False):
+                    new_lines.append(b"")  # trailing newline
+                results[target_file] = new_lines
+                continue
+
+            # A header without usable hunks would otherwise "apply" as a no-op
+            if not is_delete and not patch.changes:
+                raise ValueError(f"No hunks to apply in {rel_path}.")
+
             # Strict Context Check & Dry Apply
-            if not is_new:
-                # This uses whatthepatch's internal context verification
-                # If it raises HunkApplyException or returns None, it means context mismatch
-                try:
-                    new_lines = whatthepatch.apply_diff(patch, content.splitlines())
-                except Exception as e:
-                    new_lines = None # Treat exception as failure
-                
-                if new_lines is None:
-                    print(f"❌ ERROR: Context Mismatch in {rel_path}.")
-                    print("   The code the AI 'saw' does not match the file on disk.")
-                    print("   Action aborted to prevent corruption.")
-                    return False
-                pending_changes.append((target_file, new_lines))
-            elif is_new:
-                 # valid new file
-                 # reconstruct from patch changes for new file
-                 new_lines = []
-                 for change in patch.changes:
-                     if change.line is not None: 
-                        new_lines.append(change.line)
-                 pending_changes.append((target_file, new_lines))
-            elif is_delete:
-                 # We mark for deletion by setting new_lines to None
-                 pending_changes.append((target_file, None))
-
-        print("✅ Structural Guard Passed. Applying changes...")
-
-        # --- PHASE 2: ATOMIC APPLICATION ---
-        backups: List[Tuple[Path, Path]] = []
-        backup_dir.mkdir(parents=True, exist_ok=True)
-        
-        try:
-            for target_file, new_lines in pending_changes:
-                # 1. Backup
-                if target_file.exists():
-                    backup_file = backup_dir / f"{target_file.name}.bak"
-                    shutil.copy2(target_file, backup_file)
-                    backups.append((target_file, backup_file))
-                else:
-                    backups.append((target_file, None))
+            new_lines = DiffApplier._splice(patch, lines)
+            if new_lines is None:
+                raise ValueError(
+                    f"Context Mismatch in {rel_path}.\n"
+                    "   The code the AI 'saw' does not match the file on disk.\n"
+                    "   Action aborted to prevent corruption."
+                )
+            results[target_file] = None if is_delete else new_lines
 
-                # 2. Write (or delete)
-                if new_lines is None: # Delete
-                    target_file.unlink()
-                else:
-                    target_file.parent.mkdir(parents=True, exist_ok=True)
-                    with open(target_file, "w", encoding="utf-8") as f:
-                        f.write("\n".join(new_lines) + "\n")
-            
-            print(f"SUCCESS: Applied changes to {len(pending_changes)} files.")
-            
-            # 3. Post-flight Validation (Tests)
-            if (base / "tests").exists():
-                print("🧪 Running post-flight validation (pytest)...")
-                import subprocess
-                result = subprocess.run(["pytest"], cwd=str(base), capture_output=True, text=True)
-                if result.returncode != 0:
-                    print(f"❌ Validation FAILED:\n{result.stdout}")
-                    raise Exception("Post-flight validation failed. Tests are broken.")
+        return [
+            (target, originals[target], None if new_lines is None else eols.get(target, b"\n").join(new_lines))
+            for target, new_lines in results.items()
+        ]
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _classify(old_path: Optional[str], new_path: Optional[str]) -> Tuple[Optional[str], bool, bool]:
+        """
+        Maps a patch header to (relative path, is_new, is_delete). The path is None
+        when the header names no file. Cached, as agent retries resend the same diffs.
+        """
+        is_new = old_path == "/dev/null"
+        is_delete = new_path == "/dev/null"
+        rel_path = old_path if is_delete else new_path or old_path
+
+        if not rel_path or rel_path == "/dev/null":
+            return None, is_new, is_delete
+        if rel_path.startswith(("a/", "b/")):
+            rel_path = rel_path[2:]
+        return rel_path, is_new, is_delete
+
+    @staticmethod
+    def _commit(
+        plan: List[Tuple[Path, Optional[bytes], Optional[bytes]]],
+        touched: Dict[Path, Optional[bytes]]
+    ):
+        """Writes (or deletes) every planned file, recording its original in touched first."""
+        # Only new files can need a directory; create each one once, shallowest first
+        parents = {target.parent for target, original, new_data in plan if original is None and new_data is not None}
+        for parent in sorted(parents, key=lambda p: len(p.parts)):
+            parent.mkdir(parents=True, exist_ok=True)
+
+        for target_file, original, new_data in plan:
+            touched[target_file] = original
+            if new_data is None:
+                target_file.unlink()
+            else:
+                DiffApplier._replace_file(target_file, new_data)
+
+    @staticmethod
+    def _rollback(touched: Dict[Path, Optional[bytes]]):
+        """Restores the pre-diff state, captured by _plan, of the touched files."""
+        for target_file, original in touched.items():
+            try:
+                if original is not None:
+                    DiffApplier._replace_file(target_file, original)
                 else:
-                    print("✅ Post-flight validation passed!")
-            
+                    target_file.unlink(missing_ok=True)
+            except OSError as e:
+                # Keep going so one stuck file does not block restoring the rest
+                log.error("❌ ERROR: Could not restore %s: %s", target_file, e)
+
+    @staticmethod
+    def _split_lines(content: AnyStr) -> List[AnyStr]:
+        """
+        Splits text or bytes on "\n" only, so joining with "\n" restores it exactly;
+        a trailing newline becomes a final empty element. CRLF is normalised to LF,
+        since diff context lines never carry the CR.
+        """
+        cr, lf = ("\r", "\n") if isinstance(content, str) else (b"\r", b"\n")
+        if cr in content:
+            content = content.replace(cr + lf, lf)
+        return content.split(lf)
+
+    @staticmethod
+    def _replace_file(target_file: Path, data: bytes):
+        """
+        Writes data to a sibling temp file and swaps it in with os.replace, so
+        the target is never left half-written. Keeps the permissions of an
+        existing file.
+        """
+        tmp_file = target_file.with_name(f".{target_file.name}.axion-tmp")
+        try:
+            tmp_file.write_bytes(data)
+            try:
+                shutil.copymode(target_file, tmp_file)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_file, target_file)
+        except BaseException:
+            tmp_file.unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def run_post_flight(base: Path) -> bool:
+        """Runs the project's test suite (if any) after changes were written."""
+        if not (base / "tests").exists():
             return True
 
-        except Exception as e:
-            print(f"CRITICAL ERROR during write: {e}. Starting rollback...")
-            for target, backup in backups:
-                if backup and backup.exists():
-                    shutil.move(str(backup), str(target))
-                elif not backup and target.exists():
-                    target.unlink()
+        log.info("🧪 Running post-flight validation (pytest)...")
+        result = subprocess.run(["pytest"], cwd=str(base), capture_output=True, text=True)
+        if result.returncode != 0:
+            log.error("❌ Validation FAILED:\n%s", result.stdout)
             return False
+        log.info("✅ Post-flight validation passed!")
+        return True
 
     @staticmethod
     def apply_whole_file(file_path: str, content: str):
-        """Safely overwrite or create a file."""
+        """Safely overwrite or create a file. Identical content is left untouched."""
         target = Path(file_path)
-        target.parent.mkdir(parents=True, exist_ok=True)
-        with open(target, 'w', encoding='utf-8') as f:
-            f.write(content)
+        new_bytes = content.encode("utf-8")
+        try:
+            if target.read_bytes() == new_bytes:
+                return True
+        except FileNotFoundError:
+            target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(new_bytes)
         return True
@@ -28,6 +28,8 @@ def build():
         "--name", output_name,
         # Tree-sitter hidden imports
         "--hidden-import", "tree_sitter_python",
+        # Translation tables are loaded from JSON at runtime
+        "--add-data", f"axion/core/locales{os.pathsep}axion/core/locales",
         # Entry point
         entry_point
     ]
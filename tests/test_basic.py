@@ -16,3 +16,18 @@ def test_version():
 def test_cli_import():
     from axion.cli.main import app
     assert app.registered_commands is not None
+
+def test_subcommand_help_skips_onboarding(monkeypatch, tmp_path):
+    import sys
+    from typer.testing import CliRunner
+    from axion.cli import main
+
+    def no_onboarding():
+        raise AssertionError("onboarding started")
+
+    monkeypatch.setattr(main, "CONFIG_FILE", tmp_path / "missing.toml")
+    monkeypatch.setattr(main, "run_onboarding", no_onboarding)
+    monkeypatch.setattr(sys, "argv", ["axion", "solve", "--help"])
+    result = CliRunner().invoke(main.app, ["solve", "--help"])
+    assert result.exit_code == 0
+    assert "Usage" in result.output
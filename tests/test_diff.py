@@ -66,3 +66,306 @@ def test_apply_new_file(tmp_path):
     new_file = tmp_path / "new_file.py"
     assert new_file.exists()
     assert new_file.read_text() == "print('new file')\n"
+
+def test_apply_multiple_patches_to_same_file(tmp_path):
+    file_path = tmp_path / "multi.py"
+    file_path.write_text("a\nb\nc\n")
+
+    # Two separate git patches for one file: the second builds on the first
+    diff_text = """diff --git a/multi.py b/multi.py
+--- a/multi.py
++++ b/multi.py
+@@ -1,3 +1,3 @@
+-a
++A
+ b
+ c
+diff --git a/multi.py b/multi.py
+--- a/multi.py
++++ b/multi.py
+@@ -1,3 +1,3 @@
+ A
+ b
+-c
++C
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert file_path.read_text() == "A\nb\nC\n"
+
+def test_apply_delete_file(tmp_path):
+    file_path = tmp_path / "old.py"
+    file_path.write_text("gone\n")
+
+    diff_text = """--- old.py
++++ /dev/null
+@@ -1 +0,0 @@
+-gone
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert not file_path.exists()
+
+def test_post_flight_failure_restores_files(tmp_path, monkeypatch):
+    existing = tmp_path / "keep.py"
+    existing.write_text("original\n")
+
+    diff_text = """--- keep.py
++++ keep.py
+@@ -1 +1 @@
+-original
++changed
+--- /dev/null
++++ added.py
+@@ -0,0 +1 @@
++new
+"""
+    monkeypatch.setattr(DiffApplier, "run_post_flight", staticmethod(lambda base: False))
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is False
+    assert existing.read_text() == "original\n"
+    assert not (tmp_path / "added.py").exists()
+
+def test_apply_preserves_file_mode(tmp_path):
+    script = tmp_path / "run.sh"
+    script.write_text("echo hi\n")
+    script.chmod(0o755)
+
+    diff_text = """--- run.sh
++++ run.sh
+@@ -1 +1 @@
+-echo hi
++echo hello
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert script.read_text() == "echo hello\n"
+    assert script.stat().st_mode & 0o777 == 0o755
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["run.sh"]
+
+def test_apply_keeps_missing_trailing_newline(tmp_path):
+    file_path = tmp_path / "no_eol.py"
+    file_path.write_text("a\nb")
+
+    diff_text = """--- no_eol.py
++++ no_eol.py
+@@ -1,2 +1,2 @@
+-a
++A
+ b
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert file_path.read_text() == "A\nb"
+
+def test_apply_honours_no_newline_markers(tmp_path):
+    grown = tmp_path / "grown.py"
+    grown.write_bytes(b"a\nb")
+    trimmed = tmp_path / "trimmed.py"
+    trimmed.write_bytes(b"a\nb\n")
+
+    diff_text = """--- grown.py
++++ grown.py
+@@ -2 +2,2 @@
+-b
+\\ No newline at end of file
++b
++c
+--- trimmed.py
++++ trimmed.py
+@@ -2 +2 @@
+-b
++B
+\\ No newline at end of file
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert grown.read_bytes() == b"a\nb\nc\n"
+    assert trimmed.read_bytes() == b"a\nB"
+
+def test_apply_appends_at_end_of_file(tmp_path):
+    file_path = tmp_path / "tail.py"
+    file_path.write_bytes(b"a\r\nb\r\n")
+
+    diff_text = """--- tail.py
++++ tail.py
+@@ -1,2 +1,3 @@
+ a
+ b
++c
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert file_path.read_bytes() == b"a\r\nb\r\nc\r\n"
+
+def test_rollback_only_restores_written_files(tmp_path, monkeypatch):
+    first = tmp_path / "first.py"
+    first.write_text("one\n")
+    second = tmp_path / "second.py"
+    second.write_text("two\n")
+
+    diff_text = """diff --git a/first.py b/first.py
+--- a/first.py
++++ b/first.py
+@@ -1 +1 @@
+-one
++ONE
+diff --git a/second.py b/second.py
+--- a/second.py
++++ b/second.py
+@@ -1 +1 @@
+-two
++TWO
+"""
+    written = []
+    real_replace = DiffApplier._replace_file
+
+    def failing_replace(target_file, data):
+        written.append(target_file.name)
+        if target_file.name == "second.py" and len(written) == 2:
+            raise OSError("disk full")
+        real_replace(target_file, data)
+
+    monkeypatch.setattr(DiffApplier, "_replace_file", staticmethod(failing_replace))
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is False
+    assert first.read_text() == "one\n"
+    assert second.read_text() == "two\n"
+    # first.py written then restored; second.py failed and was restored once
+    assert written == ["first.py", "second.py", "first.py", "second.py"]
+
+def test_apply_rejects_path_outside_base(tmp_path):
+    base = tmp_path / "project"
+    base.mkdir()
+    outside = tmp_path / "secret.py"
+    outside.write_text("keep\n")
+
+    diff_text = """--- ../secret.py
++++ ../secret.py
+@@ -1 +1 @@
+-keep
++owned
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(base)) is False
+    assert outside.read_text() == "keep\n"
+
+def test_apply_logs_context_mismatch(tmp_path, caplog):
+    (tmp_path / "hello.py").write_text("print('hello')\n")
+
+    diff_text = """--- hello.py
++++ hello.py
+@@ -1 +1 @@
+-WRONG CONTENT
++print('hello world')
+"""
+    with caplog.at_level("INFO", logger="axion.tools.diff"):
+        assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is False
+    assert "Context Mismatch in hello.py" in caplog.text
+
+def test_apply_new_file_in_new_directory(tmp_path):
+    diff_text = """--- /dev/null
++++ pkg/sub/a.py
+@@ -0,0 +1 @@
++a = 1
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert (tmp_path / "pkg" / "sub" / "a.py").read_text() == "a = 1\n"
+
+def test_apply_whole_file_skips_identical_content(tmp_path):
+    target = tmp_path / "pkg" / "mod.py"
+    assert DiffApplier.apply_whole_file(str(target), "x = 1\n") is True
+    assert target.read_text() == "x = 1\n"
+
+    os.utime(target, (0, 0))
+    assert DiffApplier.apply_whole_file(str(target), "x = 1\n") is True
+    assert target.stat().st_mtime == 0
+
+    assert DiffApplier.apply_whole_file(str(target), "x = 2\n") is True
+    assert target.read_text() == "x = 2\n"
+
+def test_classify_patch_headers():
+    assert DiffApplier._classify("a/x.py", "b/x.py") == ("x.py", False, False)
+    assert DiffApplier._classify("/dev/null", "b/new.py") == ("new.py", True, False)
+    assert DiffApplier._classify("a/old.py", "/dev/null") == ("old.py", False, True)
+    assert DiffApplier._classify(None, None) == (None, False, False)
+
+def test_apply_plain_multi_file_diff(tmp_path):
+    (tmp_path / "first.py").write_text("one\n")
+    (tmp_path / "second.py").write_text("a\nb\nc\n")
+
+    # Plain ---/+++ headers back to back: hunk line counts decide where each patch ends
+    diff_text = """--- first.py
++++ first.py
+@@ -1 +1 @@
+-one
++ONE
+--- second.py
++++ second.py
+@@ -1,0 +2 @@
++inserted
+@@ -3 +4 @@
+-c
++C
+--- /dev/null
++++ third.py
+@@ -0,0 +1 @@
++three
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert (tmp_path / "first.py").read_text() == "ONE\n"
+    assert (tmp_path / "second.py").read_text() == "a\ninserted\nb\nC\n"
+    assert (tmp_path / "third.py").read_text() == "three\n"
+
+def test_parse_patches_defers_malformed_hunks():
+    # Undercounted hunk: the trailing "+b" sits outside it
+    assert DiffApplier._parse_patches("--- x.py\n+++ x.py\n@@ -1 +1 @@\n-a\n+A\n+b\n") is None
+    assert DiffApplier._parse_patches("--- x.py\n+++ x.py\nGIT binary patch\n") is None
+
+def test_apply_leaves_untouched_bytes_alone(tmp_path):
+    file_path = tmp_path / "legacy.py"
+    file_path.write_bytes(b"# caf\xe9\nx = 1\n")
+
+    diff_text = """--- legacy.py
++++ legacy.py
+@@ -2 +2 @@
+-x = 1
++x = 2
+"""
+    # The latin-1 line is outside the hunk, so it is kept byte for byte
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert file_path.read_bytes() == b"# caf\xe9\nx = 2\n"
+
+def test_apply_patches_symlink_target(tmp_path):
+    real = tmp_path / "real"
+    real.mkdir()
+    (real / "f.py").write_text("a\n")
+    (tmp_path / "link.py").symlink_to(real / "f.py")
+
+    diff_text = """--- link.py
++++ link.py
+@@ -1 +1 @@
+-a
++b
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is True
+    assert (tmp_path / "link.py").is_symlink()
+    assert (real / "f.py").read_text() == "b\n"
+
+def test_apply_rejects_symlinked_directory_outside_base(tmp_path):
+    base = tmp_path / "project"
+    base.mkdir()
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "secret.py").write_text("keep\n")
+    (base / "escape").symlink_to(outside)
+
+    diff_text = """--- escape/secret.py
++++ escape/secret.py
+@@ -1 +1 @@
+-keep
++owned
+"""
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(base)) is False
+    assert (outside / "secret.py").read_text() == "keep\n"
+
+@pytest.mark.parametrize("diff_text", [
+    "--- f.py\n+++ f.py\n",
+    "--- f.py\n+++ f.py\n@@ @@\n-a\n+b\n",
+])
+def test_apply_rejects_patch_without_hunks(tmp_path, diff_text):
+    file_path = tmp_path / "f.py"
+    file_path.write_text("a\n")
+    assert DiffApplier.apply_unified_diff(diff_text, base_path=str(tmp_path)) is False
+    assert file_path.read_text() == "a\n"
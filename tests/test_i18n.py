@@ -0,0 +1,36 @@
+import pytest
+from axion.core import i18n
+
+@pytest.fixture(autouse=True)
+def fresh_lang_cache():
+    i18n.invalidate_lang_cache()
+    yield
+    i18n.invalidate_lang_cache()
+
+def test_translation_uses_configured_language(monkeypatch):
+    monkeypatch.setattr(i18n, "get_config_value", lambda *args, **kwargs: "pt")
+    assert i18n.t("solve.cancelled") == "[yellow]Operação cancelada.[/]"
+
+def test_unknown_language_falls_back_to_english(monkeypatch):
+    monkeypatch.setattr(i18n, "get_config_value", lambda *args, **kwargs: "es")
+    assert i18n.t("solve.cancelled") == "[yellow]Operation cancelled.[/]"
+
+def test_missing_key_returns_key(monkeypatch):
+    monkeypatch.setattr(i18n, "get_config_value", lambda *args, **kwargs: "en")
+    assert i18n.t("does.not.exist") == "does.not.exist"
+
+def test_language_is_resolved_once(monkeypatch):
+    calls = []
+    def fake_get_config_value(*args, **kwargs):
+        calls.append(args)
+        return "en"
+    monkeypatch.setattr(i18n, "get_config_value", fake_get_config_value)
+    i18n.t("solve.cancelled")
+    i18n.t("solve.success")
+    assert len(calls) == 1
+
+def test_placeholders_are_formatted(monkeypatch):
+    monkeypatch.setattr(i18n, "get_config_value", lambda *args, **kwargs: "en")
+    assert i18n.t("error.solve_failed", error="boom") == "[bold red]Solve failed:[/] boom"
+    # Missing arguments leave the template untouched instead of raising
+    assert i18n.t("error.solve_failed") == "[bold red]Solve failed:[/] {error}"
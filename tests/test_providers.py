@@ -0,0 +1,83 @@
+from axion.core import providers
+from axion.core.providers import (
+    detect_or_probe_provider,
+    clear_http_cache,
+    detect_provider,
+    AnthropicProvider,
+    GeminiProvider,
+    GroqProvider,
+    OpenAIProvider,
+    OllamaProvider,
+    ProviderKind,
+    PROVIDER_LABELS,
+)
+
+def test_detect_or_probe_provider_prefix_fast_path():
+    provider = detect_or_probe_provider("sk-ant-123")
+    assert isinstance(provider, AnthropicProvider)
+
+def test_detect_or_probe_provider_probes_ollama_for_unknown_keys(monkeypatch):
+    def reachable(self, api_key):
+        return True
+
+    monkeypatch.setattr(OllamaProvider, "validate_key", reachable)
+    provider = detect_or_probe_provider("not-a-known-key")
+    assert isinstance(provider, OllamaProvider)
+
+def test_detect_or_probe_provider_returns_none_when_nothing_matches(monkeypatch):
+    def unreachable(self, api_key):
+        return False
+
+    monkeypatch.setattr(OllamaProvider, "validate_key", unreachable)
+    assert detect_or_probe_provider("not-a-known-key") is None
+
+def test_openai_model_filter():
+    model_ids = ["gpt-4o", "gpt-4o-Realtime-preview", "o1-mini", "text-embedding-3-small", "gpt-3.5-turbo-instruct"]
+    models = OpenAIProvider()._filter_models(model_ids)
+    assert [m.id for m in models] == ["gpt-4o", "o1-mini"]
+
+def test_detect_provider_prefixes():
+    assert isinstance(detect_provider("sk-ant-abc"), AnthropicProvider)
+    assert isinstance(detect_provider("sk-proj-abc"), OpenAIProvider)
+    assert isinstance(detect_provider("gsk_abc"), GroqProvider)
+    assert isinstance(detect_provider("AIzaabc"), GeminiProvider)
+    assert isinstance(detect_provider("Ollama"), OllamaProvider)
+    assert detect_provider("unknown") is None
+
+def test_detect_provider_reuses_instances():
+    assert detect_provider("sk-abc") is detect_provider("sk-def")
+
+def test_ollama_tags_are_cached(monkeypatch):
+    calls = []
+
+    class FakeResponse:
+        content = b'{"models": [{"name": "llama3"}]}'
+        def raise_for_status(self):
+            pass
+
+    def fake_get(url, **kwargs):
+        calls.append(url)
+        return FakeResponse()
+
+    clear_http_cache()
+    monkeypatch.setattr(providers._CLIENT, "get", fake_get)
+    provider = OllamaProvider()
+    assert provider.validate_key("ollama")
+    assert [m.id for m in provider.list_models("ollama")] == ["llama3"]
+    assert len(calls) == 1
+
+    clear_http_cache()
+    provider.list_models("ollama")
+    assert len(calls) == 2
+    clear_http_cache()
+
+def test_provider_kind_behaves_like_its_value():
+    kind = detect_provider("gsk_abc").name
+    assert kind is ProviderKind.GROQ
+    assert kind == "groq"
+    assert f"{kind}" == "groq"
+    assert PROVIDER_LABELS[kind] == "GROQ"
+
+def test_groq_model_filter():
+    models = GroqProvider()._filter_models(["llama-3.1-8b", "whisper-large-v3-audio", "llava-Vision"])
+    assert [m.id for m in models] == ["llama-3.1-8b"]
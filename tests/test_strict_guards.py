@@ -72,3 +72,17 @@ def test_contract_enforcement():
     Test that run_solve raises ValueError if model returns invalid content.
     """
 
+
+def test_validate_diff_context():
+    import whatthepatch
+    diff = """--- f.py
++++ f.py
+@@ -2,2 +2,2 @@
+ b
+-c
++C
+"""
+    patch = next(whatthepatch.parse_patch(diff))
+    assert DiffApplier.validate_diff_context(patch, "a\nb\nc\n")
+    assert not DiffApplier.validate_diff_context(patch, "a\nb\nX\n")
+    assert not DiffApplier.validate_diff_context(patch, "a\nb\n")